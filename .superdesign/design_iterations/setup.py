@@ -4,23 +4,70 @@ BMAD Scrum Master Agent Setup Script
 Advanced Scrum Master AI Agent for BMAD-METHOD Framework
 """
 
+from pathlib import Path
+
 from setuptools import setup, find_packages
-import os
 
 # Read the README file
 def read_readme():
-    with open("BMAD_SCRUM_MASTER_DOCUMENTATION.md", "r", encoding="utf-8") as fh:
-        return fh.read()
+    return Path("BMAD_SCRUM_MASTER_DOCUMENTATION.md").read_text(encoding="utf-8")
 
 # Read requirements
 def read_requirements():
-    requirements = []
-    with open("requirements.txt", "r", encoding="utf-8") as fh:
-        for line in fh:
-            line = line.strip()
-            if line and not line.startswith("#"):
-                requirements.append(line)
-    return requirements
+    lines = Path("requirements.txt").read_text(encoding="utf-8").splitlines()
+    return [line for line in (raw.strip() for raw in lines) if line and not line.startswith("#")]
+
+# Optional dependency groups; "all" is the union of every group
+extras_require = {
+    "dev": [
+        "pytest>=7.1.0",
+        "pytest-asyncio>=0.19.0",
+        "pytest-cov>=3.0.0",
+        "black>=22.6.0",
+        "flake8>=5.0.0",
+        "mypy>=0.971",
+        "isort>=5.10.0",
+        "pre-commit>=2.20.0",
+    ],
+    "ai": [
+        "tensorflow>=2.9.0",
+        "torch>=1.12.0",
+        "transformers>=4.21.0",
+        "spacy>=3.4.0",
+        "nltk>=3.7.0",
+    ],
+    # Data science stack, e.g. pip install "bmad-scrum-master[analytics,aws]"
+    "analytics": [
+        "numpy>=1.21.0",
+        "pandas>=1.3.0",
+        "scikit-learn>=1.0.0",
+    ],
+    "azure": [
+        "azure-devops>=6.0.0",
+        "azure-storage-blob>=12.12.0",
+    ],
+    "aws": [
+        "boto3>=1.24.0",
+        "botocore>=1.27.0",
+    ],
+    "gcp": [
+        "google-cloud-storage>=2.5.0",
+        "google-api-python-client>=2.65.0",
+    ],
+    "monitoring": [
+        "prometheus-client>=0.14.0",
+        "sentry-sdk>=1.9.0",
+        "datadog>=0.44.0",
+    ],
+    "visualization": [
+        "matplotlib>=3.5.0",
+        "seaborn>=0.11.0",
+        "plotly>=5.10.0",
+    ],
+}
+extras_require["all"] = sorted(
+    {req for group in extras_require.values() for req in group}
+)
 
 # Package metadata
 setup(
@@ -52,7 +99,6 @@ setup(
     python_requires=">=3.9",
     install_requires=[
         # Core dependencies
-        "asyncio>=3.4.3",
         "aiohttp>=3.8.0",
         "aiofiles>=0.8.0",
         "pydantic>=1.10.0",
@@ -65,11 +111,6 @@ setup(
         "python-dotenv>=0.19.0",
         "structlog>=22.1.0",
         
-        # Data science
-        "numpy>=1.21.0",
-        "pandas>=1.3.0",
-        "scikit-learn>=1.0.0",
-        
         # Security
         "cryptography>=3.4.0",
         "python-jose[cryptography]>=3.3.0",
@@ -79,88 +120,11 @@ setup(
         "slack-sdk>=3.18.0",
         "PyGithub>=1.55.0",
         
-        # Cloud services
-        "boto3>=1.24.0",
-        
         # CLI
         "click>=8.1.0",
         "rich>=12.5.0",
     ],
-    extras_require={
-        "dev": [
-            "pytest>=7.1.0",
-            "pytest-asyncio>=0.19.0",
-            "pytest-cov>=3.0.0",
-            "black>=22.6.0",
-            "flake8>=5.0.0",
-            "mypy>=0.971",
-            "isort>=5.10.0",
-            "pre-commit>=2.20.0",
-        ],
-        "ai": [
-            "tensorflow>=2.9.0",
-            "torch>=1.12.0",
-            "transformers>=4.21.0",
-            "spacy>=3.4.0",
-            "nltk>=3.7.0",
-        ],
-        "azure": [
-            "azure-devops>=6.0.0",
-            "azure-storage-blob>=12.12.0",
-        ],
-        "aws": [
-            "boto3>=1.24.0",
-            "botocore>=1.27.0",
-        ],
-        "gcp": [
-            "google-cloud-storage>=2.5.0",
-            "google-api-python-client>=2.65.0",
-        ],
-        "monitoring": [
-            "prometheus-client>=0.14.0",
-            "sentry-sdk>=1.9.0",
-            "datadog>=0.44.0",
-        ],
-        "visualization": [
-            "matplotlib>=3.5.0",
-            "seaborn>=0.11.0",
-            "plotly>=5.10.0",
-        ],
-        "all": [
-            # Development tools
-            "pytest>=7.1.0",
-            "pytest-asyncio>=0.19.0",
-            "pytest-cov>=3.0.0",
-            "black>=22.6.0",
-            "flake8>=5.0.0",
-            "mypy>=0.971",
-            "isort>=5.10.0",
-            "pre-commit>=2.20.0",
-            
-            # AI/ML
-            "tensorflow>=2.9.0",
-            "torch>=1.12.0",
-            "transformers>=4.21.0",
-            "spacy>=3.4.0",
-            "nltk>=3.7.0",
-            
-            # Cloud platforms
-            "azure-devops>=6.0.0",
-            "azure-storage-blob>=12.12.0",
-            "boto3>=1.24.0",
-            "google-cloud-storage>=2.5.0",
-            
-            # Monitoring
-            "prometheus-client>=0.14.0",
-            "sentry-sdk>=1.9.0",
-            "datadog>=0.44.0",
-            
-            # Visualization
-            "matplotlib>=3.5.0",
-            "seaborn>=0.11.0",
-            "plotly>=5.10.0",
-        ]
-    },
+    extras_require=extras_require,
     entry_points={
         "console_scripts": [
             "bmad-scrum-master=bmad_scrum_master.cli:main",
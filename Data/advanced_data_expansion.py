@@ -7,31 +7,75 @@ Multi-source approach with synthetic augmentation and quality control
 import json
 import re
 import logging
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import hashlib
-import random
-from datasets import load_dataset, Dataset
-import pandas as pd
-import requests
+from typing import List, Dict, Any, Optional, Set, Tuple, TYPE_CHECKING
+import numpy as np
+import ahocorasick
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xxhash
 from urllib.parse import quote
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
+if TYPE_CHECKING:
+    from datasketch import LeanMinHash
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Text cleaning patterns, compiled once at import
+WHITESPACE_RE = re.compile(r'\s+')
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+DISALLOWED_CHARS_RE = re.compile(r'[^\w\säöüÄÖÜß.,;:!?()"-]')
+UMLAUT_RE = re.compile(r'[äöüÄÖÜß]')
+# ASCII-only equivalent of DISALLOWED_CHARS_RE for str.translate
+ASCII_DISALLOWED_TABLE = str.maketrans('', '', ''.join(
+    ch for ch in map(chr, range(128))
+    if not (ch.isalnum() or ch in '_ .,;:!?()"-')
+))
+# Fixed pieces of the instruction-tuning sample format
+INST_PREFIX = "<s>[INST] "
+INST_SEPARATOR = " [/INST] "
+INST_SUFFIX = " </s>"
+# Block sizes for raw binary JSONL reads and buffered writes
+READ_BLOCK_SIZE = 1 << 20
+WRITE_BUFFER_SIZE = 1 << 20
+# Parquet output layout, written in record batches of PARQUET_BATCH_ROWS
+PARQUET_SCHEMA = pa.schema([
+    ('text', pa.large_string()),
+    ('source', pa.string()),
+    ('category', pa.string())
+])
+PARQUET_BATCH_ROWS = 10_000
+# Near-duplicate detection: MinHash over character shingles, LSH at a Jaccard threshold
+MINHASH_PERMUTATIONS = 128
+SHINGLE_SIZE = 5
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
 class AdvancedLegalDataExpander:
     """Advanced system for expanding German legal datasets"""
     
-    def __init__(self, input_dir: str = "prepared_data", output_dir: str = "expanded_legal_data"):
+    # Number of independently locked dedup shards (power of two)
+    HASH_SHARDS = 16
+    
+    def __init__(self, input_dir: str = "prepared_data", output_dir: str = "expanded_legal_data",
+                 seed: Optional[int] = None):
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
-        self.collected_hashes = set()
-        self.lock = threading.Lock()
+        self.rng = np.random.default_rng(seed)
+        # Dedup hashes are sharded by their low bits so concurrent loaders
+        # only contend on a lock when they land in the same shard
+        self.collected_hashes = [set() for _ in range(self.HASH_SHARDS)]
+        self.hash_locks = [threading.Lock() for _ in range(self.HASH_SHARDS)]
+        # Near-duplicate index, built on first use by apply_quality_filtering
+        self.near_duplicate_lsh = None
+        self.minhash_template = None
         
         # Alternative German legal datasets
         self.alternative_datasets = [
@@ -71,6 +115,16 @@ class AdvancedLegalDataExpander:
                 "Teleologisch betrachtet ergibt sich"
             ]
         }
+        # Flattened view of legal_patterns for batched index sampling
+        self.pattern_types = list(self.legal_patterns.keys())
+        self.pattern_counts = np.array([len(self.legal_patterns[t]) for t in self.pattern_types])
+        
+        # Legal terms used to fill synthetic sentences
+        self.legal_terms = [
+            "Vertragspartner", "Rechtsprechung", "Gesetzeslage", "Rechtsnorm",
+            "Rechtsfolge", "Anspruchsgrundlage", "Schadensersatz", "Erfüllung",
+            "Leistungsstörung", "Gewährleistung", "Haftung", "Verjährung"
+        ]
         
         # Instruction templates for data augmentation
         self.instruction_templates = [
@@ -85,19 +139,47 @@ class AdvancedLegalDataExpander:
             "Was bedeutet dieser juristische Begriff:",
             "Wie ist diese Rechtsnorm zu verstehen?"
         ]
+        
+        # Keyword lists for language and relevance checks
+        self.german_indicators = [
+            'der', 'die', 'das', 'und', 'oder', 'mit', 'von', 'zu', 'im', 'am',
+            'ist', 'sind', 'wird', 'werden', 'haben', 'hat', 'sein', 'eine', 'einen',
+            'recht', 'gesetz', 'paragraph', 'artikel', 'bgb', 'stgb', 'gg',
+            'gericht', 'richter', 'urteil', 'entscheidung', 'klage'
+        ]
+        self.legal_keywords = [
+            'recht', 'gesetz', 'paragraph', 'artikel', 'bgb', 'stgb', 'gg',
+            'gericht', 'richter', 'urteil', 'vertrag', 'anspruch', 'haftung',
+            'schadensersatz', 'klage', 'revision', 'berufung', 'instanz'
+        ]
+        
+        # Aho-Corasick automaton over both keyword lists, so a text is scanned
+        # once instead of once per keyword; payload is (keyword, is_indicator, is_legal)
+        self.keyword_automaton = ahocorasick.Automaton()
+        for keyword in set(self.german_indicators) | set(self.legal_keywords):
+            self.keyword_automaton.add_word(
+                keyword,
+                (keyword, keyword in self.german_indicators, keyword in self.legal_keywords)
+            )
+        self.keyword_automaton.make_automaton()
     
-    def calculate_hash(self, content: str) -> str:
-        """Calculate SHA-256 hash for deduplication"""
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    def calculate_hash(self, content: str) -> int:
+        """Calculate 64-bit xxh3 hash for in-memory deduplication (not cryptographic)"""
+        return xxhash.xxh3_64_intdigest(content.encode('utf-8'))
     
     def is_duplicate(self, content: str) -> bool:
         """Thread-safe duplicate checking"""
-        content_hash = self.calculate_hash(content)
-        with self.lock:
-            if content_hash in self.collected_hashes:
-                return True
-            self.collected_hashes.add(content_hash)
-            return False
+        return self.register_hash(self.calculate_hash(content))
+    
+    def register_hash(self, content_hash: int) -> bool:
+        """Record a content hash; returns True if it had already been seen"""
+        shard = content_hash & (self.HASH_SHARDS - 1)
+        hashes = self.collected_hashes[shard]
+        with self.hash_locks[shard]:
+            # Single probe: the set only grows if the hash was new
+            size = len(hashes)
+            hashes.add(content_hash)
+            return len(hashes) == size
     
     def load_existing_data(self) -> List[Dict[str, Any]]:
         """Load existing training data"""
@@ -108,17 +190,32 @@ class AdvancedLegalDataExpander:
             full_path = self.input_dir / file_path
             if full_path.exists():
                 logger.info(f"Loading existing data from {file_path}")
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        try:
-                            data = json.loads(line.strip())
-                            existing_data.append(data)
-                        except json.JSONDecodeError:
-                            continue
+                for line in self.iter_jsonl_lines(full_path):
+                    try:
+                        existing_data.append(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        continue
         
         logger.info(f"Loaded {len(existing_data)} existing examples")
         return existing_data
     
+    def iter_jsonl_lines(self, path: Path):
+        """Yield non-empty raw lines of a JSONL file, reading it in large binary blocks"""
+        with open(path, 'rb') as f:
+            pending = b''
+            while True:
+                block = f.read(READ_BLOCK_SIZE)
+                if not block:
+                    break
+                lines = (pending + block).split(b'\n')
+                # The last piece may be a partial line continued in the next block
+                pending = lines.pop()
+                for line in lines:
+                    if line:
+                        yield line
+            if pending:
+                yield pending
+    
     def search_alternative_datasets(self) -> List[Dict[str, Any]]:
         """Search for alternative legal datasets"""
         all_data = []
@@ -132,49 +229,63 @@ class AdvancedLegalDataExpander:
             'pile-of-law/pile-of-law'
         ]
         
-        for dataset_name in legal_datasets:
+        # Loading is network-bound, so fetch the datasets concurrently
+        with ThreadPoolExecutor(max_workers=min(8, len(legal_datasets))) as executor:
+            futures = {
+                executor.submit(self.fetch_dataset, dataset_name): dataset_name
+                for dataset_name in legal_datasets
+            }
+            for future in as_completed(futures):
+                try:
+                    all_data.extend(future.result())
+                except Exception as e:
+                    logger.warning(f"Failed to load {futures[future]}: {e}")
+        
+        return all_data
+    
+    def fetch_dataset(self, dataset_name: str) -> List[Dict[str, Any]]:
+        """Stream German examples from a single HuggingFace dataset"""
+        # Imported here so callers that never stream from the Hub skip its import cost
+        from datasets import load_dataset
+        
+        dataset_data = []
+        logger.info(f"Attempting to load {dataset_name}")
+        
+        # Try different configurations
+        configurations = [None, 'train', 'german', 'de']
+        
+        for config in configurations:
             try:
-                logger.info(f"Attempting to load {dataset_name}")
+                if config:
+                    dataset = load_dataset(dataset_name, config, split='train', streaming=True)
+                else:
+                    dataset = load_dataset(dataset_name, split='train', streaming=True)
                 
-                # Try different configurations
-                configurations = [None, 'train', 'german', 'de']
+                # Process up to 1000 examples per dataset
+                count = 0
+                for example in dataset:
+                    if count >= 1000:
+                        break
+                    
+                    # Extract German text content
+                    content = self.extract_german_content(example)
+                    if content and len(content) > 100:
+                        if not self.is_duplicate(content):
+                            dataset_data.append({
+                                'text': content,
+                                'source': f'huggingface_{dataset_name}',
+                                'category': 'legal_corpus'
+                            })
+                            count += 1
                 
-                for config in configurations:
-                    try:
-                        if config:
-                            dataset = load_dataset(dataset_name, config, split='train', streaming=True)
-                        else:
-                            dataset = load_dataset(dataset_name, split='train', streaming=True)
-                        
-                        # Process up to 1000 examples per dataset
-                        count = 0
-                        for example in dataset:
-                            if count >= 1000:
-                                break
-                                
-                            # Extract German text content
-                            content = self.extract_german_content(example)
-                            if content and len(content) > 100:
-                                if not self.is_duplicate(content):
-                                    all_data.append({
-                                        'text': content,
-                                        'source': f'huggingface_{dataset_name}',
-                                        'category': 'legal_corpus'
-                                    })
-                                    count += 1
-                        
-                        logger.info(f"Loaded {count} examples from {dataset_name} (config: {config})")
-                        break  # Success, don't try other configs
-                        
-                    except Exception as e:
-                        logger.debug(f"Config {config} failed for {dataset_name}: {e}")
-                        continue
-                        
+                logger.info(f"Loaded {count} examples from {dataset_name} (config: {config})")
+                break  # Success, don't try other configs
+            
             except Exception as e:
-                logger.warning(f"Failed to load {dataset_name}: {e}")
+                logger.debug(f"Config {config} failed for {dataset_name}: {e}")
                 continue
         
-        return all_data
+        return dataset_data
     
     def extract_german_content(self, example: Dict[str, Any]) -> Optional[str]:
         """Extract German content from dataset example"""
@@ -193,34 +304,35 @@ class AdvancedLegalDataExpander:
     
     def is_likely_german(self, text: str) -> bool:
         """Check if text is likely German"""
-        # German indicators
-        german_indicators = [
-            'der', 'die', 'das', 'und', 'oder', 'mit', 'von', 'zu', 'im', 'am',
-            'ist', 'sind', 'wird', 'werden', 'haben', 'hat', 'sein', 'eine', 'einen',
-            'recht', 'gesetz', 'paragraph', 'artikel', 'bgb', 'stgb', 'gg',
-            'gericht', 'richter', 'urteil', 'entscheidung', 'klage'
-        ]
-        
-        # German umlauts
-        german_chars = ['ä', 'ö', 'ü', 'ß', 'Ä', 'Ö', 'Ü']
-        
-        text_lower = text.lower()
-        
-        # Count German indicators
-        indicator_count = sum(1 for indicator in german_indicators if indicator in text_lower)
-        char_count = sum(1 for char in german_chars if char in text)
+        # Any umlaut or ß is decisive on its own, so skip the keyword scan
+        if UMLAUT_RE.search(text):
+            return True
         
         # Simple heuristic
-        return indicator_count > 3 or char_count > 0
+        indicator_count, _ = self.count_keywords(text.lower())
+        return indicator_count > 3
+    
+    def count_keywords(self, text_lower: str) -> Tuple[int, int]:
+        """Count distinct German indicators and legal keywords in one automaton pass"""
+        matched: Set[Tuple[str, bool, bool]] = {
+            payload for _, payload in self.keyword_automaton.iter(text_lower)
+        }
+        indicator_count = sum(1 for _, is_indicator, _ in matched if is_indicator)
+        legal_count = sum(1 for _, _, is_legal in matched if is_legal)
+        return indicator_count, legal_count
     
     def clean_text(self, text: str) -> str:
         """Clean and normalize text"""
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_RE.sub(' ', text)
         # Remove HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
+        if '<' in text:
+            text = HTML_TAG_RE.sub('', text)
         # Keep German characters and basic punctuation
-        text = re.sub(r'[^\w\säöüÄÖÜß.,;:!?()"-]', '', text)
+        if text.isascii():
+            text = text.translate(ASCII_DISALLOWED_TABLE)
+        else:
+            text = DISALLOWED_CHARS_RE.sub('', text)
         return text.strip()
     
     def generate_synthetic_variations(self, existing_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -252,10 +364,11 @@ class AdvancedLegalDataExpander:
         text_excerpt = text[:800] + "..." if len(text) > 800 else text
         
         # Create 3 random instruction variations
-        selected_templates = random.sample(self.instruction_templates, min(3, len(self.instruction_templates)))
+        template_idx = self.rng.choice(len(self.instruction_templates),
+                                       size=min(3, len(self.instruction_templates)), replace=False)
         
-        for template in selected_templates:
-            instruction_text = f"<s>[INST] {template} [/INST] {text_excerpt} </s>"
+        for template in (self.instruction_templates[i] for i in template_idx.tolist()):
+            instruction_text = "".join((INST_PREFIX, template, INST_SEPARATOR, text_excerpt, INST_SUFFIX))
             
             if not self.is_duplicate(instruction_text):
                 variations.append({
@@ -270,28 +383,27 @@ class AdvancedLegalDataExpander:
         """Generate completely synthetic legal texts"""
         synthetic_texts = []
         
-        paragraph_numbers = [str(i) for i in range(1, 1000)]
-        
-        for i in range(count):
-            # Choose random pattern type
-            pattern_type = random.choice(list(self.legal_patterns.keys()))
-            patterns = self.legal_patterns[pattern_type]
-            
-            # Generate synthetic text
-            base_pattern = random.choice(patterns)
+        # Draw every random choice for the batch up front
+        type_idx = self.rng.integers(0, len(self.pattern_types), size=count)
+        pattern_idx = (self.rng.random(count) * self.pattern_counts[type_idx]).astype(np.intp)
+        paragraphs = self.rng.integers(1, 1000, size=count)
+        instruction_idx = self.rng.integers(0, len(self.instruction_templates), size=count)
+        legal_contents = self.generate_legal_contents(count)
+        
+        for t_idx, p_idx, paragraph, i_idx, legal_content in zip(
+                type_idx.tolist(), pattern_idx.tolist(), paragraphs.tolist(),
+                instruction_idx.tolist(), legal_contents):
+            pattern_type = self.pattern_types[t_idx]
+            base_pattern = self.legal_patterns[pattern_type][p_idx]
             
             # Fill in paragraph numbers where needed
             if '{}' in base_pattern:
-                paragraph = random.choice(paragraph_numbers)
                 base_pattern = base_pattern.format(paragraph)
             
-            # Add random legal content
-            legal_content = self.generate_legal_content()
-            full_text = f"{base_pattern} {legal_content}"
-            
             # Create instruction format
-            instruction = random.choice(self.instruction_templates)
-            synthetic_text = f"<s>[INST] {instruction} [/INST] {full_text} </s>"
+            instruction = self.instruction_templates[i_idx]
+            synthetic_text = "".join((INST_PREFIX, instruction, INST_SEPARATOR,
+                                      base_pattern, " ", legal_content, INST_SUFFIX))
             
             if not self.is_duplicate(synthetic_text):
                 synthetic_texts.append({
@@ -302,67 +414,111 @@ class AdvancedLegalDataExpander:
         
         return synthetic_texts
     
-    def generate_legal_content(self) -> str:
-        """Generate random legal content"""
-        legal_terms = [
-            "Vertragspartner", "Rechtsprechung", "Gesetzeslage", "Rechtsnorm",
-            "Rechtsfolge", "Anspruchsgrundlage", "Schadensersatz", "Erfüllung",
-            "Leistungsstörung", "Gewährleistung", "Haftung", "Verjährung"
+    def generate_legal_contents(self, count: int) -> List[str]:
+        """Generate `count` random legal contents of 2-4 sentences each"""
+        terms = self.legal_terms
+        sentence_counts = self.rng.integers(2, 5, size=count)
+        total = int(sentence_counts.sum())
+        
+        # Each sentence names one term and, two times in three, a second distinct term
+        first = self.rng.integers(0, len(terms), size=total)
+        second = (first + self.rng.integers(1, len(terms), size=total)) % len(terms)
+        has_second = self.rng.integers(1, 4, size=total) > 1
+        
+        sentences = [
+            f"Die {terms[a]} betrifft die rechtliche Bewertung der Situation."
+            + (f" Dabei ist die {terms[b]} zu berücksichtigen." if two else "")
+            for a, b, two in zip(first.tolist(), second.tolist(), has_second.tolist())
         ]
         
-        # Generate 2-4 sentences
-        sentences = []
-        for _ in range(random.randint(2, 4)):
-            terms = random.sample(legal_terms, random.randint(1, 3))
-            sentence = f"Die {terms[0]} betrifft die rechtliche Bewertung der Situation."
-            if len(terms) > 1:
-                sentence += f" Dabei ist die {terms[1]} zu berücksichtigen."
-            sentences.append(sentence)
-        
-        return " ".join(sentences)
+        contents = []
+        pos = 0
+        for n in sentence_counts.tolist():
+            contents.append(" ".join(sentences[pos:pos + n]))
+            pos += n
+        return contents
     
     def apply_quality_filtering(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Apply quality filtering to the data"""
+        # Imported here so callers that never filter skip datasketch's (scipy) import cost
+        from datasketch import MinHash, MinHashLSH
+        
+        if self.near_duplicate_lsh is None:
+            # Empty template MinHash is copied so its permutations are generated once instead of per text
+            self.near_duplicate_lsh = MinHashLSH(threshold=NEAR_DUPLICATE_THRESHOLD,
+                                                 num_perm=MINHASH_PERMUTATIONS)
+            self.minhash_template = MinHash(num_perm=MINHASH_PERMUTATIONS)
+        
         filtered_data = []
         
         for item in data:
             text = item.get('text', '')
+            content_hash = self.filter_one(text)
+            if content_hash is None:
+                continue
             
-            # Quality criteria
-            if (len(text) > 50 and  # Minimum length
-                len(text) < 8000 and  # Maximum length
-                not self.is_duplicate(text) and  # No duplicates
-                self.contains_legal_content(text)):  # Legal relevance
-                
+            # Near-duplicate check against everything kept so far
+            if not self.is_near_duplicate(content_hash, self.compute_minhash(text)):
                 filtered_data.append(item)
         
         logger.info(f"Quality filtering: {len(data)} -> {len(filtered_data)} examples")
         return filtered_data
     
-    def contains_legal_content(self, text: str) -> bool:
-        """Check if text contains legal content"""
-        legal_keywords = [
-            'recht', 'gesetz', 'paragraph', 'artikel', 'bgb', 'stgb', 'gg',
-            'gericht', 'richter', 'urteil', 'vertrag', 'anspruch', 'haftung',
-            'schadensersatz', 'klage', 'revision', 'berufung', 'instanz'
-        ]
+    def filter_one(self, text: str) -> Optional[int]:
+        """Run all quality criteria on a text, hashing it only once.
         
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in legal_keywords)
+        Returns the content hash if the text is kept, otherwise None.
+        """
+        # Minimum and maximum length
+        if not 50 < len(text) < 8000:
+            return None
+        
+        # No duplicates
+        content_hash = self.calculate_hash(text)
+        if self.register_hash(content_hash):
+            return None
+        
+        # Legal relevance
+        if not self.contains_legal_content(text):
+            return None
+        
+        return content_hash
+    
+    def compute_minhash(self, text: str) -> "LeanMinHash":
+        """MinHash signature over the character shingles of a text"""
+        from datasketch import LeanMinHash
+        
+        shingles = {text[i:i + SHINGLE_SIZE].encode('utf-8')
+                    for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+        minhash = self.minhash_template.copy()
+        minhash.update_batch(list(shingles))
+        return LeanMinHash(minhash)
+    
+    def is_near_duplicate(self, content_hash: int, signature: "LeanMinHash") -> bool:
+        """Check a signature against the LSH index, indexing it if no near-duplicate exists"""
+        if self.near_duplicate_lsh.query(signature):
+            return True
+        self.near_duplicate_lsh.insert(content_hash, signature)
+        return False
+    
+    def contains_legal_content(self, text: str) -> bool:
+        """Check if text contains legal content, stopping at the first legal keyword"""
+        return any(is_legal for _, (_, _, is_legal) in self.keyword_automaton.iter(text.lower()))
     
     def save_expanded_dataset(self, data: List[Dict[str, Any]]):
         """Save the expanded dataset in multiple formats"""
-        # Shuffle data
-        random.shuffle(data)
-        
-        # Create splits
-        total = len(data)
-        train_size = int(0.8 * total)
-        val_size = int(0.1 * total)
-        
-        train_data = data[:train_size]
-        val_data = data[train_size:train_size + val_size]
-        test_data = data[train_size + val_size:]
+        # Create 80/10/10 splits from the content hash, so a sample always lands
+        # in the same split across reruns (as long as the hash function is
+        # unchanged) and newly added data cannot leak existing samples into test
+        train_data, val_data, test_data = [], [], []
+        for item in data:
+            bucket = self.calculate_hash(item.get('text', '')) % 10
+            if bucket < 8:
+                train_data.append(item)
+            elif bucket == 8:
+                val_data.append(item)
+            else:
+                test_data.append(item)
         
         # Save splits
         splits = {
@@ -371,20 +527,11 @@ class AdvancedLegalDataExpander:
             'test': test_data
         }
         
-        for split_name, split_data in splits.items():
-            # Save as JSONL
-            jsonl_path = self.output_dir / f"{split_name}.jsonl"
-            with open(jsonl_path, 'w', encoding='utf-8') as f:
-                for item in split_data:
-                    json.dump(item, f, ensure_ascii=False)
-                    f.write('\n')
-            
-            # Save as Parquet
-            df = pd.DataFrame(split_data)
-            parquet_path = self.output_dir / f"{split_name}.parquet"
-            df.to_parquet(parquet_path, index=False)
-            
-            logger.info(f"Saved {len(split_data)} examples to {split_name} split")
+        # Splits are written to independent files, so overlap the disk I/O
+        with ThreadPoolExecutor(max_workers=len(splits)) as executor:
+            for future in [executor.submit(self.write_split, name, split_data)
+                           for name, split_data in splits.items()]:
+                future.result()
         
         # Save metadata
         metadata = {
@@ -393,7 +540,7 @@ class AdvancedLegalDataExpander:
             'format': 'instruction_tuning',
             'language': 'german',
             'domain': 'legal',
-            'expansion_date': pd.Timestamp.now().isoformat(),
+            'expansion_date': datetime.now(timezone.utc).isoformat(),
             'sources': list(set(item.get('source', 'unknown') for item in data))
         }
         
@@ -403,6 +550,30 @@ class AdvancedLegalDataExpander:
         logger.info(f"Dataset expansion complete! Total: {len(data)} examples")
         return len(data)
     
+    def write_split(self, split_name: str, split_data: List[Dict[str, Any]]):
+        """Write one split as JSONL and as Parquet"""
+        # Save as JSONL
+        jsonl_path = self.output_dir / f"{split_name}.jsonl"
+        with open(jsonl_path, 'wb') as f:
+            buffer = bytearray()
+            for item in split_data:
+                buffer += orjson.dumps(item)
+                buffer += b'\n'
+                if len(buffer) >= WRITE_BUFFER_SIZE:
+                    f.write(buffer)
+                    buffer.clear()
+            if buffer:
+                f.write(buffer)
+        
+        # Save as Parquet, one record batch at a time to bound peak memory
+        parquet_path = self.output_dir / f"{split_name}.parquet"
+        with pq.ParquetWriter(parquet_path, PARQUET_SCHEMA, compression='zstd') as writer:
+            for start in range(0, len(split_data), PARQUET_BATCH_ROWS):
+                batch = split_data[start:start + PARQUET_BATCH_ROWS]
+                writer.write_table(pa.Table.from_pylist(batch, schema=PARQUET_SCHEMA))
+        
+        logger.info(f"Saved {len(split_data)} examples to {split_name} split")
+    
     def expand_dataset(self) -> int:
         """Main method to expand the dataset"""
         logger.info("Starting advanced dataset expansion...")
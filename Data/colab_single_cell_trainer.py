@@ -11,31 +11,42 @@ print("=" * 50)
 
 # Step 1: Install packages
 print("📦 Installing packages...")
+torch_packages = ["torch==2.1.0", "torchvision==0.16.0", "torchaudio==2.1.0"]
 packages = [
     "numpy==1.24.3",
-    "torch==2.1.0 torchvision==0.16.0 torchaudio==2.1.0 --index-url https://download.pytorch.org/whl/cu121",
-    "transformers==4.35.2",
+    "transformers==4.36.2",
     "datasets==2.14.6", 
     "accelerate==0.24.1",
     "peft==0.6.2",
     "bitsandbytes==0.41.2.post2",
-    "huggingface_hub==0.17.3",
+    "huggingface_hub==0.19.4",
     "pandas==1.5.3"
 ]
 
-for package in packages:
-    print(f"Installing {package.split('==')[0]}...")
-    result = subprocess.run([sys.executable, "-m", "pip", "install", "-q"] + package.split(), 
+# One pip run per index, so the resolver only runs twice instead of once per package
+install_groups = [
+    (torch_packages, ["--index-url", "https://download.pytorch.org/whl/cu121"]),
+    (packages, [])
+]
+for group, index_args in install_groups:
+    print(f"Installing {', '.join(package.split('==')[0] for package in group)}...")
+    result = subprocess.run([sys.executable, "-m", "pip", "install", "-q"] + group + index_args, 
                           capture_output=True, text=True)
+    # One resolver failure skips the whole group, so stop here instead of failing on import later
+    if result.returncode != 0:
+        print(result.stderr)
+        raise RuntimeError(f"pip install failed for: {' '.join(group)}")
 
 print("✅ Packages installed")
 
 # Step 2: Import and check environment
 import torch
+import torch._dynamo
 import numpy as np
 from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, TrainingArguments, Trainer, DataCollatorForLanguageModeling
-from peft import LoraConfig, get_peft_model, TaskType
+from peft import LoraConfig, get_peft_model, prepare_model_for_kbit_training, TaskType
 from datasets import Dataset
+from datasets.fingerprint import Hasher
 import pandas as pd
 import json
 import zipfile
@@ -111,7 +122,7 @@ model_candidates = ['microsoft/DialoGPT-medium', 'DiscoResearch/DiscoLM_German_7
 model_name = None
 for candidate in model_candidates:
     try:
-        tokenizer = AutoTokenizer.from_pretrained(candidate)
+        tokenizer = AutoTokenizer.from_pretrained(candidate, use_fast=True)
         model_name = candidate
         print(f"✅ Using: {model_name}")
         break
@@ -122,15 +133,36 @@ if tokenizer.pad_token is None:
     tokenizer.pad_token = tokenizer.eos_token
 tokenizer.padding_side = "right"
 
-quantization_config = BitsAndBytesConfig(load_in_8bit=True, llm_int8_threshold=6.0)
-model = AutoModelForCausalLM.from_pretrained(
-    model_name,
-    quantization_config=quantization_config,
-    device_map="auto",
-    trust_remote_code=True,
-    torch_dtype=torch.float16
+# QLoRA: 4-bit NF4 weights with bf16 compute on Ampere+ GPUs, fp16 on older ones (T4)
+use_bf16 = torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+compute_dtype = torch.bfloat16 if use_bf16 else torch.float16
+quantization_config = BitsAndBytesConfig(
+    load_in_4bit=True,
+    bnb_4bit_quant_type="nf4",
+    bnb_4bit_compute_dtype=compute_dtype,
+    bnb_4bit_use_double_quant=True
 )
-model.gradient_checkpointing_enable()
+# Prefer fused attention kernels; fall back when the model or runtime lacks support
+# (Flash Attention 2 needs the flash-attn package and an Ampere+ GPU)
+attn_candidates = ["flash_attention_2", "sdpa", "eager"]
+for attn_implementation in attn_candidates:
+    try:
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            quantization_config=quantization_config,
+            device_map="auto",
+            trust_remote_code=True,
+            torch_dtype=compute_dtype,
+            attn_implementation=attn_implementation
+        )
+        print(f"✅ Attention: {attn_implementation}")
+        break
+    except (ValueError, ImportError) as e:
+        # eager always exists, so a failure there is a real loading error
+        if attn_implementation == attn_candidates[-1]:
+            raise
+        print(f"⚠️ {attn_implementation} unavailable: {str(e)[:80]}")
+model = prepare_model_for_kbit_training(model, use_gradient_checkpointing=True)
 
 print(f"✅ Model loaded: {model.num_parameters():,} parameters")
 
@@ -150,26 +182,66 @@ print(f"✅ LoRA: {trainable:,} trainable ({100*trainable/total:.2f}%)")
 
 # Step 7: Prepare training
 print("🔤 Tokenizing...")
+max_length = 1024
 def tokenize_function(examples):
-    return tokenizer(examples["text"], truncation=True, padding=False, max_length=1024)
-
-tokenized_train = train_dataset.map(tokenize_function, batched=True, remove_columns=train_dataset.column_names)
-tokenized_eval = eval_dataset.map(tokenize_function, batched=True, remove_columns=eval_dataset.column_names)
+    tokenized = tokenizer(examples["text"], truncation=True, padding=False, max_length=max_length)
+    # Sequence lengths for length-grouped batching
+    tokenized["length"] = [len(ids) for ids in tokenized["input_ids"]]
+    return tokenized
+
+# Tokenize in parallel and keep the result on disk. datasets reloads an explicit
+# cache_file_name without checking it, so the name carries the split fingerprint
+# and a hash of tokenize_function: reruns reuse it only while both are unchanged
+os.environ["TOKENIZERS_PARALLELISM"] = "true"
+cache_dir = "./tokenized-cache"
+os.makedirs(cache_dir, exist_ok=True)
+cache_prefix = f"{cache_dir}/{model_name.replace('/', '_')}-{max_length}-{Hasher.hash(tokenize_function)}"
+
+def tokenize_split(split, name):
+    return split.map(
+        tokenize_function, batched=True, batch_size=1000,
+        num_proc=min(os.cpu_count() or 1, len(split)),
+        remove_columns=split.column_names,
+        load_from_cache_file=True, cache_file_name=f"{cache_prefix}-{name}-{split._fingerprint}.arrow"
+    )
+
+tokenized_train = tokenize_split(train_dataset, "train")
+tokenized_eval = tokenize_split(eval_dataset, "eval")
+
+# torch.compile needs a working Inductor/Triton toolchain (Dynamo in torch 2.1 also
+# rejects Python 3.12+); compile a trivial kernel once and train eagerly if that fails.
+# This only checks the toolchain: a failure compiling the model itself is retried in Step 8
+use_compile = False
+if torch.cuda.is_available():
+    try:
+        torch.compile(lambda x: x * 2 + 1)(torch.ones(8, device="cuda"))
+        use_compile = True
+    except Exception as e:
+        print(f"⚠️ torch.compile unavailable, training eagerly: {str(e)[:80]}")
+print(f"✅ torch.compile: {use_compile}")
 
 output_dir = "./german-legal-model"
-training_args = TrainingArguments(
-    output_dir=output_dir, overwrite_output_dir=True, num_train_epochs=2,
-    per_device_train_batch_size=1, gradient_accumulation_steps=8,
-    learning_rate=5e-5, fp16=True, gradient_checkpointing=True,
-    logging_steps=5, eval_steps=10, evaluation_strategy="steps",
-    save_steps=20, save_total_limit=2, remove_unused_columns=False, report_to=None
-)
-
-data_collator = DataCollatorForLanguageModeling(tokenizer=tokenizer, mlm=False)
-trainer = Trainer(
-    model=model, args=training_args, train_dataset=tokenized_train,
-    eval_dataset=tokenized_eval, data_collator=data_collator, tokenizer=tokenizer
-)
+lm_collator = DataCollatorForLanguageModeling(tokenizer=tokenizer, mlm=False)
+def data_collator(features):
+    # "length" only drives the length-grouped sampler; keep it out of the model inputs
+    return lm_collator([{k: v for k, v in f.items() if k != "length"} for f in features])
+
+def build_trainer(compile_model):
+    training_args = TrainingArguments(
+        output_dir=output_dir, overwrite_output_dir=True, num_train_epochs=2,
+        per_device_train_batch_size=4, gradient_accumulation_steps=2,
+        learning_rate=5e-5, bf16=use_bf16, fp16=not use_bf16, gradient_checkpointing=True,
+        logging_steps=5, eval_steps=10, evaluation_strategy="steps",
+        save_steps=20, save_total_limit=2, remove_unused_columns=False, report_to=None,
+        torch_compile=compile_model,
+        group_by_length=True, length_column_name="length"
+    )
+    return Trainer(
+        model=model, args=training_args, train_dataset=tokenized_train,
+        eval_dataset=tokenized_eval, data_collator=data_collator, tokenizer=tokenizer
+    )
+
+trainer = build_trainer(use_compile)
 
 # Step 8: Train
 print("🏋️ Starting training...")
@@ -177,7 +249,17 @@ torch.cuda.empty_cache()
 start_time = time.time()
 
 try:
-    training_result = trainer.train()
+    try:
+        training_result = trainer.train()
+    except torch._dynamo.exc.TorchDynamoException as e:
+        # The toolchain probe passed but the model itself did not compile: train eagerly
+        if not use_compile:
+            raise
+        print(f"⚠️ Compiled training failed, retrying without torch.compile: {str(e)[:80]}")
+        torch._dynamo.reset()
+        trainer = build_trainer(False)
+        start_time = time.time()
+        training_result = trainer.train()
     training_time = time.time() - start_time
     
     print(f"✅ Training completed in {training_time/60:.1f} minutes")
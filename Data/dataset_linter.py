@@ -1,7 +1,35 @@
+import hashlib
 import json
 import os
 import re
-from typing import Dict, Any, List, Tuple, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Set, Tuple, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    # optional: answer_simhash falls back to a per-bit count in plain Python
+    np = None
+
+try:
+    import ahocorasick
+except ImportError:
+    # optional: infer_expected_families falls back to a substring scan per hint
+    ahocorasick = None
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    # stdlib fallback; json.loads accepts UTF-8 bytes as well
+    json_loads = json.loads
+
+    def json_dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
 
 """
 Dataset Linter for German Legal Instructi
@@ -34,6 +62,7 @@ Validation rules:
      - Also reject common misattributions (e.g., using StPO for Diebstahl, which belongs to StGB).
   5) Consistency checks between legal_term/category and code family (basic heuristics).
   6) Boilerplate/same-answer clones (basic similarity hash to reduce obvious duplicates)
+     - Near-duplicate answers (64-bit SimHash within a few bits Hamming distance) are dropped as well.
 
 Notes:
   - This linter is conservative. It will discard rows that fail any critical check.
@@ -46,12 +75,35 @@ DATA_DIR = os.path.join(BASE_DIR, "massive_legal_data")
 INPUT_PATH = os.path.join(DATA_DIR, "train.jsonl")
 CLEAN_PATH = os.path.join(DATA_DIR, "clean.train.jsonl")
 REPORT_PATH = os.path.join(DATA_DIR, "quality_report.md")
+MAX_REPORTED_ISSUES = 500
 
 # Regexes
-INST_OPEN_RE = re.compile(r"<s>\s*\[INST\]\s*(.+?)\s*\[/INST\]\s*(.+?)\s*</s>|<s>\s*\[INST\]\s*(.+?)\s*\[/INST\]\s*(.+?)\s*</s>", re.DOTALL)
+INST_OPEN_RE = re.compile(r"<s>\s*\[INST\]\s*(.+?)\s*\[/INST\]\s*(.+?)\s*</s>", re.DOTALL)
 PLACEHOLDER_RE = re.compile(r"\{(?:NAME|LAW_REF|PER|LOC)\}")
 WHITESPACE_RE = re.compile(r"\s+")
 
+# Characters dropped before fingerprinting an answer
+FINGERPRINT_CLEAN_RE = re.compile(r"[^a-zäöüß0-9 ]")
+
+# Near-duplicate answers: 64-bit SimHash split into bands; any sketch within
+# SIMHASH_MAX_DISTANCE bits must share at least one band exactly (pigeonhole)
+SIMHASH_BANDS = 4
+SIMHASH_BAND_BITS = 16
+SIMHASH_MAX_DISTANCE = 3
+
+# Characters that may end a complete answer
+END_PUNCTUATION = frozenset(".!?»”)")
+
+# Boilerplate answer phrases, matched with a single alternation
+BOILERPLATE_PATTERNS = [
+    r"Nach der ständigen Rechtsprechung des Bundesgerichtshofs",
+    r"Die Rechtssicherheit gebietet eine einheitliche Anwendung",
+    r"Die praktische Anwendung erfordert eine umfassende Würdigung",
+    r"Im Ergebnis führt dies zu folgenden rechtlichen Konsequenzen",
+    r"Eine abweichende Beurteilung kommt nur in begründeten Ausnahmefällen in Betracht",
+]
+BOILERPLATE_RE = re.compile("|".join(f"(?:{pat})" for pat in BOILERPLATE_PATTERNS))
+
 # Legal source parsing
 LEGAL_SOURCE_RE = re.compile(
     r"^\s*(?P<code>BGB|StGB|StPO|VwVfG|VwGO|GG)\s*[§|Art\.]?\s*(?P<num>[\d]+)(?:\s*Abs\.\s*\d+)?", re.IGNORECASE
@@ -124,23 +176,30 @@ CATEGORY_HINTS = {
     "arbeitsrecht_case": {"BGB"},
 }
 
+# Lowercased term hints compiled into one automaton (payload: code families), so a
+# legal_term is scanned once instead of once per hint
+TERM_HINTS_LOWER = [(k.lower(), families) for k, families in EXPECTED_FAMILY_HINTS.items()]
+TERM_HINT_AUTOMATON = None
+if ahocorasick is not None:
+    TERM_HINT_AUTOMATON = ahocorasick.Automaton()
+    for _term, _families in TERM_HINTS_LOWER:
+        TERM_HINT_AUTOMATON.add_word(_term, _families)
+    TERM_HINT_AUTOMATON.make_automaton()
+
+# Category hints keyed by lowercased category for exact-match lookup
+CATEGORY_HINTS_LOWER = {k.lower(): families for k, families in CATEGORY_HINTS.items()}
+
 def normalize_text(s: str) -> str:
     return WHITESPACE_RE.sub(" ", s).strip()
 
 def parse_inst_block(text: str) -> Optional[Tuple[str, str]]:
     """
-    Extract instruction and answer from the <s>[INST] ... [/INST] ... </s> or <s> variant.
+    Extract instruction and answer from the <s>[INST] ... [/INST] ... </s> template.
     """
     m = INST_OPEN_RE.search(text)
     if not m:
         return None
-    # The regex has two alternatives; pick non-None groups
-    groups = m.groups()
-    if len(groups) == 4:
-        inst = groups[0] if groups[0] is not None else groups[2]
-        ans = groups[1] if groups[1] is not None else groups[3]
-    else:
-        inst, ans = groups[0], groups[1]
+    inst, ans = m.group(1), m.group(2)
     if not inst or not ans:
         return None
     inst = normalize_text(inst)
@@ -174,13 +233,16 @@ def infer_expected_families(sample: Dict[str, Any]) -> List[str]:
     term = str(sample.get("legal_term", "") or "")
     cat = str(sample.get("category", "") or "")
     # Check term hints
-    for k, families in EXPECTED_FAMILY_HINTS.items():
-        if k.lower() in term.lower():
+    term_lower = term.lower()
+    if TERM_HINT_AUTOMATON is not None:
+        for _, families in TERM_HINT_AUTOMATON.iter(term_lower):
             hints.update(families)
+    else:
+        for k, families in TERM_HINTS_LOWER:
+            if k in term_lower:
+                hints.update(families)
     # Check category hints
-    for k, families in CATEGORY_HINTS.items():
-        if k.lower() == cat.lower():
-            hints.update(families)
+    hints.update(CATEGORY_HINTS_LOWER.get(cat.lower(), ()))
     return sorted(hints)
 
 def is_truncated_answer(ans: str) -> bool:
@@ -188,47 +250,77 @@ def is_truncated_answer(ans: str) -> bool:
     if ans.endswith("..."):
         return True
     # If last char is an unmatched opening clause
-    if len(ans) > 40 and not re.search(r"[\.!?»”)]\s*$", ans):
-        return True
-    return False
+    tail = ans.rstrip()
+    return len(ans) > 40 and (not tail or tail[-1] not in END_PUNCTUATION)
 
 def looks_like_boilerplate(ans: str) -> bool:
-    boilerplate_patterns = [
-        r"Nach der ständigen Rechtsprechung des Bundesgerichtshofs",
-        r"Die Rechtssicherheit gebietet eine einheitliche Anwendung",
-        r"Die praktische Anwendung erfordert eine umfassende Würdigung",
-        r"Im Ergebnis führt dies zu folgenden rechtlichen Konsequenzen",
-        r"Eine abweichende Beurteilung kommt nur in begründeten Ausnahmefällen in Betracht",
-    ]
-    return any(re.search(pat, ans) for pat in boilerplate_patterns)
-
-def simple_answer_fingerprint(ans: str) -> str:
-    # crude fingerprint to help detect clones
-    s = ans.lower()
-    s = re.sub(r"[^a-zäöüß0-9 ]", "", s)
-    s = WHITESPACE_RE.sub(" ", s)
+    return BOILERPLATE_RE.search(ans) is not None
+
+def simple_answer_fingerprint(ans: str) -> int:
+    # crude fingerprint to help detect clones, as a 64-bit int so the seen-set stays small
+    s = FINGERPRINT_CLEAN_RE.sub("", ans.lower())
     tokens = s.split()
     core = tokens[:40]  # first 40 tokens
-    return " ".join(core)
+    digest = hashlib.blake2b(" ".join(core).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+@lru_cache(maxsize=None)
+def token_hash(token: str) -> int:
+    # legal vocabulary repeats heavily, so each distinct token is hashed once
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+def answer_simhash(ans: str) -> int:
+    # 64-bit SimHash over the normalized answer tokens: a bit is set when most token hashes set it
+    tokens = FINGERPRINT_CLEAN_RE.sub("", ans.lower()).split()
+    if np is None:
+        counts = [0] * 64
+        for h in map(token_hash, tokens):
+            for bit in range(64):
+                counts[bit] += (h >> bit) & 1
+        return sum(1 << bit for bit, count in enumerate(counts) if 2 * count > len(tokens))
+    hashes = np.fromiter(map(token_hash, tokens), dtype="<u8", count=len(tokens))
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = 2 * bits.sum(axis=0, dtype=np.int64) > len(tokens)
+    return int.from_bytes(np.packbits(majority, bitorder="little").tobytes(), "little")
+
+def simhash_bands(sketch: int) -> List[int]:
+    mask = (1 << SIMHASH_BAND_BITS) - 1
+    return [(sketch >> (SIMHASH_BAND_BITS * b)) & mask for b in range(SIMHASH_BANDS)]
+
+def is_near_duplicate(sketch: int, band_tables: List[Dict[int, List[int]]]) -> bool:
+    """
+    Check a SimHash against previously seen sketches; unseen ones are added to band_tables.
+    """
+    bands = simhash_bands(sketch)
+    for table, band in zip(band_tables, bands):
+        for other in table.get(band, ()):
+            if bin(sketch ^ other).count("1") <= SIMHASH_MAX_DISTANCE:
+                return True
+    for table, band in zip(band_tables, bands):
+        table.setdefault(band, []).append(sketch)
+    return False
 
-def validate_sample(raw: Dict[str, Any], report: Dict[str, int]) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+def validate_sample(raw: Dict[str, Any], report: Dict[str, int]) -> Tuple[bool, str, Optional[Dict[str, Any]], Optional[Tuple[int, str]]]:
+    """
+    Returns (ok, reason, cleaned_sample, (answer_fingerprint, answer)); the last two are None on rejection.
+    """
     # 1) schema
     if "text" not in raw or not isinstance(raw["text"], str):
         report["schema_invalid"] += 1
-        return False, "Missing or invalid 'text' field", None
+        return False, "Missing or invalid 'text' field", None, None
 
     text = raw["text"]
     parsed = parse_inst_block(text)
     if not parsed:
         report["inst_template_invalid"] += 1
-        return False, "Missing or invalid <s>[INST]..[/INST]..</s> template", None
+        return False, "Missing or invalid <s>[INST]..[/INST]..</s> template", None, None
 
     inst, ans = parsed
 
     # 3) placeholders
     if has_placeholders(text) or has_placeholders(inst) or has_placeholders(ans):
         report["placeholders"] += 1
-        return False, "Unresolved placeholders found", None
+        return False, "Unresolved placeholders found", None, None
 
     # 4) legal_source validation (if present)
     family_expected = infer_expected_families(raw)
@@ -236,30 +328,30 @@ def validate_sample(raw: Dict[str, Any], report: Dict[str, int]) -> Tuple[bool,
         parsed_ls = parse_legal_source(str(raw["legal_source"]))
         if not parsed_ls:
             report["legal_source_parse_failed"] += 1
-            return False, "Unparseable legal_source", None
+            return False, "Unparseable legal_source", None, None
         code, num = parsed_ls
         if not legal_source_plausible(code, num):
             report["legal_source_range_invalid"] += 1
-            return False, f"Implausible legal_source range {code} {num}", None
+            return False, f"Implausible legal_source range {code} {num}", None, None
         # basic mismatch check with hints
         if family_expected and code not in family_expected:
             report["legal_source_mismatch_expected"] += 1
-            return False, f"legal_source family {code} mismatches expected {family_expected}", None
+            return False, f"legal_source family {code} mismatches expected {family_expected}", None, None
 
     # 5) truncation
     if is_truncated_answer(ans):
         report["truncated"] += 1
-        return False, "Answer appears truncated", None
+        return False, "Answer appears truncated", None, None
 
     # 6) boilerplate detection (soft, but here we choose to reject extremely templated answers)
     if looks_like_boilerplate(ans):
         report["boilerplate"] += 1
-        return False, "Answer looks like boilerplate", None
+        return False, "Answer looks like boilerplate", None, None
 
     # Passed critical checks; return normalized sample
     cleaned = dict(raw)
     cleaned["text"] = f"<s>[INST] {inst} [/INST] {ans} </s>"
-    return True, "ok", cleaned
+    return True, "ok", cleaned, (simple_answer_fingerprint(ans), ans)
 
 def lint_file(input_path: str, clean_path: str, report_path: str) -> None:
     stats = {
@@ -274,49 +366,56 @@ def lint_file(input_path: str, clean_path: str, report_path: str) -> None:
         "truncated": 0,
         "boilerplate": 0,
         "duplicates_filtered": 0,
+        "near_duplicates_filtered": 0,
     }
 
     os.makedirs(os.path.dirname(clean_path), exist_ok=True)
-    fingerprints_seen = set()
-    kept_samples: List[Dict[str, Any]] = []
+    fingerprints_seen: Set[int] = set()
+    simhash_band_tables: List[Dict[int, List[int]]] = [{} for _ in range(SIMHASH_BANDS)]
+    # Only the first MAX_REPORTED_ISSUES messages are reported, so only those are kept
     issues: List[str] = []
 
+    def add_issue(msg: str) -> None:
+        if len(issues) < MAX_REPORTED_ISSUES:
+            issues.append(msg)
+
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"Input file not found: {input_path}")
 
-    with open(input_path, "r", encoding="utf-8") as fin:
+    # Stream: each accepted sample is written as soon as it is validated
+    with open(input_path, "rb") as fin, open(clean_path, "wb") as fout:
         for i, line in enumerate(fin, start=1):
             line = line.strip()
             if not line:
                 continue
             stats["total"] += 1
             try:
-                obj = json.loads(line)
-            except json.JSONDecodeError as e:
+                obj = json_loads(line)
+            except json.JSONDecodeError as e:  # orjson.JSONDecodeError subclasses it
                 stats["schema_invalid"] += 1
-                issues.append(f"Line {i}: JSON decode error: {e}")
+                add_issue(f"Line {i}: JSON decode error: {e}")
                 continue
 
-            ok, reason, cleaned = validate_sample(obj, stats)
+            ok, reason, cleaned, answer_info = validate_sample(obj, stats)
             if not ok:
-                issues.append(f"Line {i}: {reason}")
+                add_issue(f"Line {i}: {reason}")
                 continue
 
             # de-dup by answer fingerprint
-            inst, ans = parse_inst_block(cleaned["text"]) or ("", "")
-            fp = simple_answer_fingerprint(ans)
+            fp, ans = answer_info
             if fp in fingerprints_seen:
                 stats["duplicates_filtered"] += 1
                 continue
             fingerprints_seen.add(fp)
 
-            kept_samples.append(cleaned)
-            stats["kept"] += 1
+            # de-dup near-identical answers by SimHash distance
+            if is_near_duplicate(answer_simhash(ans), simhash_band_tables):
+                stats["near_duplicates_filtered"] += 1
+                continue
 
-    # Write cleaned
-    with open(clean_path, "w", encoding="utf-8") as fout:
-        for obj in kept_samples:
-            fout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            fout.write(json_dumps_bytes(cleaned))
+            fout.write(b"\n")
+            stats["kept"] += 1
 
     # Write report
     with open(report_path, "w", encoding="utf-8") as fr:
@@ -334,8 +433,9 @@ def lint_file(input_path: str, clean_path: str, report_path: str) -> None:
         fr.write(f"- Filtered (truncated): {stats['truncated']}\n")
         fr.write(f"- Filtered (boilerplate): {stats['boilerplate']}\n")
         fr.write(f"- Filtered (duplicates): {stats['duplicates_filtered']}\n")
-        fr.write("\n## Issues (first 500)\n")
-        for msg in issues[:500]:
+        fr.write(f"- Filtered (near duplicates): {stats['near_duplicates_filtered']}\n")
+        fr.write(f"\n## Issues (first {MAX_REPORTED_ISSUES})\n")
+        for msg in issues:
             fr.write(f"- {msg}\n")
 
     print(f"Wrote cleaned dataset to: {clean_path}")
@@ -24,6 +24,26 @@ except OSError:
 class GermanLegalDatasetPreprocessor:
     """Preprocessor for German legal documents."""
     
+    # Prompt templates for create_instruction_dataset
+    INSTRUCTION_TEMPLATES = [
+        "Analysiere diesen rechtlichen Text und erkläre die wichtigsten Punkte:",
+        "Fasse die rechtlichen Aspekte dieses Dokuments zusammen:",
+        "Erkläre die rechtlichen Implikationen dieses Textes:",
+        "Identifiziere potenzielle rechtliche Probleme in diesem Dokument:",
+        "Bewerte die rechtliche Situation basierend auf diesem Text:",
+        "Erstelle eine rechtliche Einschätzung zu folgendem Fall:",
+        "Analysiere die Rechtslage anhand dieser Informationen:",
+        "Gib eine rechtliche Bewertung zu diesem Sachverhalt ab:",
+    ]
+    
+    QA_TEMPLATES = [
+        "Was besagt {} in diesem Kontext?",
+        "Wie ist {} rechtlich zu bewerten?",
+        "Welche Bedeutung hat {} für diesen Fall?",
+        "Erkläre die Anwendung von {} hier:",
+        "Was sind die Konsequenzen von {} in dieser Situation?",
+    ]
+    
     def __init__(self, min_length: int = 50, max_length: int = 2048):
         self.min_length = min_length
         self.max_length = max_length
@@ -90,25 +110,6 @@ class GermanLegalDatasetPreprocessor:
     
     def create_instruction_dataset(self, documents: List[Dict]) -> List[Dict]:
         """Create instruction-following dataset from legal documents."""
-        instruction_templates = [
-            "Analysiere diesen rechtlichen Text und erkläre die wichtigsten Punkte:",
-            "Fasse die rechtlichen Aspekte dieses Dokuments zusammen:",
-            "Erkläre die rechtlichen Implikationen dieses Textes:",
-            "Identifiziere potenzielle rechtliche Probleme in diesem Dokument:",
-            "Bewerte die rechtliche Situation basierend auf diesem Text:",
-            "Erstelle eine rechtliche Einschätzung zu folgendem Fall:",
-            "Analysiere die Rechtslage anhand dieser Informationen:",
-            "Gib eine rechtliche Bewertung zu diesem Sachverhalt ab:",
-        ]
-        
-        qa_templates = [
-            "Was besagt {} in diesem Kontext?",
-            "Wie ist {} rechtlich zu bewerten?",
-            "Welche Bedeutung hat {} für diesen Fall?",
-            "Erkläre die Anwendung von {} hier:",
-            "Was sind die Konsequenzen von {} in dieser Situation?",
-        ]
-        
         dataset = []
         
         for doc in documents:
@@ -120,7 +121,7 @@ class GermanLegalDatasetPreprocessor:
             entities = self.extract_legal_entities(text)
             
             # Create general analysis instructions
-            for template in instruction_templates[:3]:  # Use first 3 templates
+            for template in self.INSTRUCTION_TEMPLATES[:3]:  # Use first 3 templates
                 if len(text) <= self.max_length - 200:  # Leave room for instruction
                     dataset.append({
                         'instruction': template,
@@ -134,7 +135,7 @@ class GermanLegalDatasetPreprocessor:
             for entity_type, entity_list in entities.items():
                 if entity_list:
                     for entity in entity_list[:2]:  # Max 2 per type
-                        for template in qa_templates[:2]:  # Use first 2 templates
+                        for template in self.QA_TEMPLATES[:2]:  # Use first 2 templates
                             question = template.format(entity)
                             dataset.append({
                                 'instruction': question,